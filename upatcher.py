@@ -1,92 +1,310 @@
 import os
 import re
+import glob
 import zipfile
 import subprocess
 import argparse
 import shutil
-import xml.etree.ElementTree as ET
-from typing import List
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+import urllib3
+from urllib3.util.retry import Retry
+
+try:
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+ANDROID_NS = "http://schemas.android.com/apk/res/android"
+NS_ANDROID = f"{{{ANDROID_NS}}}"
+
+try:
+    ET.register_namespace('android', ANDROID_NS)
+except AttributeError:
+    pass
+
+_SPLIT_MANIFEST_ATTRS = (
+    'requiredSplitTypes',
+    'splitTypes',
+)
+_SPLIT_META_DATA = frozenset({
+    'com.android.vending.splits',
+    'com.android.vending.splits.required',
+    'com.google.android.play.core.splitcompat.REQUIRED',
+})
+
+_PROVIDER_PATHS_XML = b"""<?xml version="1.0" encoding="utf-8"?>
+<paths>
+    <cache-path name="cache" path="." />
+</paths>
+"""
+
+_FILE_PROVIDER_NAME = b"androidx.core.content.FileProvider"
+_FILE_PROVIDER_PATHS_NAME = b"android.support.FILE_PROVIDER_PATHS"
+
+_ANDROID_PREFIX_RE = re.compile(rb'xmlns:([\w.-]+)\s*=\s*(["\'])' + re.escape(ANDROID_NS.encode()) + rb'\2')
+_MANIFEST_PACKAGE_RE = re.compile(rb'<manifest\b[^>]*?\spackage\s*=\s*(["\'])(.*?)\1', re.DOTALL)
+_PROVIDER_TAG_RE = re.compile(rb'<provider\b[^>]*>')
+_META_DATA_TAG_RE = re.compile(rb'<meta-data\b[^>]*>')
+
+APKTOOL_JOBS = str(os.cpu_count() or 4)
+
+TOOL_CACHE_DIR = ".tool-cache"
+
+APKTOOL_URL = "https://raw.githubusercontent.com/iBotPeaches/Apktool/v2.9.3/scripts/linux/apktool"
+APKTOOL_JAR_URL = "https://github.com/iBotPeaches/Apktool/releases/download/v2.9.3/apktool_2.9.3.jar"
+
+JAVA_OPTIONS = "-XX:+UseSerialGC -Xshare:auto"
 
-def run_command(command: List[str], error_message: str):
+DOWNLOAD_TIMEOUT = (10, 60)
+
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=3, backoff_factor=0.5)))
+
+def _find_build_tool(name: str) -> str:
+    """
+    Locates an Android build-tools binary, preferring PATH and then the newest build-tools in the Android SDK.
+    """
+    path = shutil.which(name)
+    if path:
+        return path
+
+    sdk_root = os.environ.get("ANDROID_HOME") or os.environ.get("ANDROID_SDK_ROOT")
+    if sdk_root:
+        candidates = {}
+        for candidate in glob.glob(f"{sdk_root}/build-tools/*/{name}"):
+            version = candidate.split("/")[-2]
+            # Skip preview releases such as 35.0.0-rc1
+            if re.fullmatch(r"\d+(\.\d+)*", version):
+                candidates[tuple(int(p) for p in version.split("."))] = candidate
+        if candidates:
+            return candidates[max(candidates)]
+
+    raise FileNotFoundError(f"Could not find '{name}'. Install Android build-tools or add it to PATH.")
+
+@functools.lru_cache(maxsize=None)
+def _java_version() -> Optional[str]:
+    """
+    Returns the `java -version` banner of the java on PATH, or None if there is none.
+    """
+    if shutil.which("java") is None:
+        return None
+    env = {k: v for k, v in os.environ.items() if k != "_JAVA_OPTIONS"}
+    result = subprocess.run(["java", "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=env)
+    return result.stderr.strip()
+
+def _java_major_version(banner: str) -> int:
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', banner)
+    if match is None:
+        return 0
+    major = int(match.group(1))
+    # Java 8 and older report themselves as 1.x
+    if major == 1 and match.group(2):
+        major = int(match.group(2))
+    return major
+
+def _apktool_env() -> Dict[str, str]:
+    """
+    Points apktool's JVM at the class data sharing archive for the current JDK, dumping one on exit if none exists yet.
+    The archive name includes a digest of the JDK's version banner, since an archive from another JDK build is ignored.
+    """
+    banner = _java_version()
+    # Dynamic CDS archives (-XX:ArchiveClassesAtExit) need JDK 13 or newer
+    if banner is None or _java_major_version(banner) < 13:
+        return {**os.environ, "_JAVA_OPTIONS": JAVA_OPTIONS}
+
+    jdk_id = hashlib.sha256(banner.encode()).hexdigest()[:12]
+    archive = f"{TOOL_CACHE_DIR}/apktool-{jdk_id}.jsa"
+    if os.path.exists(archive):
+        cds_option = f"-XX:SharedArchiveFile={archive}"
+    else:
+        cds_option = f"-XX:ArchiveClassesAtExit={archive}"
+    return {**os.environ, "_JAVA_OPTIONS": f"{JAVA_OPTIONS} {cds_option}"}
+
+def run_command(command: List[str], error_message: str, verbose: bool = False, env: Optional[Dict[str, str]] = None):
     """
     Runs a shell command and raises an exception if it fails.
+    Only stderr is captured for error reporting; stdout is discarded unless verbose, in which case it goes straight to the console
+    and any stderr output (e.g. warnings) is printed on success too.
     """
-    print(f"Executing: {' '.join(command)}")
-    result = subprocess.run(command, capture_output=True, text=True)
+    # Flush so our buffered output lands before anything the child writes to the shared stdout
+    print(f"Executing: {' '.join(command)}", flush=True)
+    result = subprocess.run(command, stdout=None if verbose else subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=env)
     if result.returncode != 0:
         print(f"Command failed! Stderr: {result.stderr}")
         raise RuntimeError(f"{error_message}: {result.stderr}")
-    print(result.stdout)
+    if verbose and result.stderr:
+        print(result.stderr)
     print("Command successful.")
 
+def _download(url: str, path: str, error_message: str):
+    """
+    Streams a URL to disk over the shared session, reusing pooled connections.
+    """
+    print(f"Downloading: {url} -> {path}")
+    try:
+        with _SESSION.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            with open(path, "wb") as f:
+                shutil.copyfileobj(r.raw, f)
+    except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+        if os.path.exists(path):
+            os.unlink(path)
+        raise RuntimeError(f"{error_message}: {e}") from e
+    print("Download successful.")
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb", buffering=0) as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _cached_download(url: str, path: str, error_message: str):
+    """
+    Downloads a tool unless an intact copy from a previous run is already on disk.
+    This is a cache integrity check only: the SHA-256 recorded at download time detects truncated or altered
+    cached copies, but the download itself is not verified against an upstream digest.
+    """
+    digest_path = f"{path}.sha256"
+    if os.path.exists(path) and os.path.exists(digest_path):
+        with open(digest_path) as f:
+            if f.read().strip() == _sha256(path):
+                print(f"Using cached {path}")
+                return
+
+    _download(url, path, error_message)
+    with open(digest_path, "w") as f:
+        f.write(_sha256(path))
+
+def _apt_install(package: str, error_message: str):
+    """
+    Installs a package without refreshing the apt index first, falling back to apt-get update only if the install fails.
+    """
+    sudo = [] if os.geteuid() == 0 else ["sudo"]
+    install_command = sudo + [
+        "apt-get", "install", "-y", "--no-install-recommends",
+        "-o", "Acquire::Languages=none",
+        "-o", "Acquire::Retries=3",
+        "-o", "APT::Install-Suggests=0",
+        package
+    ]
+    try:
+        run_command(install_command, error_message)
+    except RuntimeError:
+        print("Install failed, refreshing the package index and retrying...")
+        run_command(sudo + ["apt-get", "update", "-o", "Acquire::Languages=none"], "Failed to update apt")
+        run_command(install_command, error_message)
+
 def setup_environment(keystore_url: str) -> str:
     """
-    Sets up the necessary tools like apktool and uber-apk-signer.
+    Sets up the necessary tools like apktool.
     """
     print("Setting up the environment...")
-    run_command(["sudo", "apt-get", "update"], "Failed to update apt")
-    run_command(["sudo", "apt-get", "install", "openjdk-8-jre-headless", "-y"], "Failed to install OpenJDK 8")
-    apktool_url = "https://raw.githubusercontent.com/iBotPeaches/Apktool/master/scripts/linux/apktool"
-    apktool_jar_url = "https://github.com/iBotPeaches/Apktool/releases/download/v2.9.3/apktool_2.9.3.jar"
-    run_command(["wget", "-q", apktool_url, "-O", "apktool"], "Failed to download apktool script")
-    run_command(["wget", "-q", apktool_jar_url, "-O", "apktool.jar"], "Failed to download apktool JAR")
-    os.makedirs("/usr/local/bin", exist_ok=True)
-    os.rename("apktool", "/usr/local/bin/apktool")
-    os.rename("apktool.jar", "/usr/local/bin/apktool.jar")
-    run_command(["sudo", "chmod", "+x", "/usr/local/bin/apktool"], "Failed to set execute permissions on apktool script")
-    uber_signer_url = "https://github.com/patrickfav/uber-apk-signer/releases/download/v1.3.0/uber-apk-signer-1.3.0.jar"
-    run_command(["wget", "-q", uber_signer_url, "-O", "uber-apk-signer.jar"], "Failed to download uber-apk-signer")
+    banner = _java_version()
+    if banner is not None and _java_major_version(banner) >= 17:
+        print("Java 17 or newer is already installed, skipping apt.")
+    else:
+        _apt_install("openjdk-17-jre-headless", "Failed to install OpenJDK 17")
+        java_homes = glob.glob("/usr/lib/jvm/java-17-openjdk-*")
+        if not java_homes:
+            raise RuntimeError("OpenJDK 17 was installed but its home directory was not found under /usr/lib/jvm")
+        # The runner's default java may still come first on PATH, so put the new JDK ahead of it
+        os.environ["JAVA_HOME"] = java_homes[0]
+        os.environ["PATH"] = f"{java_homes[0]}/bin{os.pathsep}{os.environ['PATH']}"
+        _java_version.cache_clear()
+    os.environ["_JAVA_OPTIONS"] = JAVA_OPTIONS
+    os.makedirs(TOOL_CACHE_DIR, exist_ok=True)
+    apktool_path = f"{TOOL_CACHE_DIR}/apktool"
+    apktool_jar_path = f"{TOOL_CACHE_DIR}/apktool.jar"
     keystore_filename = "debug.keystore"
-    run_command(["wget", "-q", keystore_url, "-O", keystore_filename], "Failed to download debug.keystore")
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        downloads = [
+            pool.submit(_cached_download, APKTOOL_URL, apktool_path, "Failed to download apktool script"),
+            pool.submit(_cached_download, APKTOOL_JAR_URL, apktool_jar_path, "Failed to download apktool JAR"),
+            pool.submit(_download, keystore_url, keystore_filename, "Failed to download debug.keystore"),
+        ]
+        for future in downloads:
+            future.result()
+    os.makedirs("/usr/local/bin", exist_ok=True)
+    shutil.copy2(apktool_path, "/usr/local/bin/apktool")
+    shutil.copy2(apktool_jar_path, "/usr/local/bin/apktool.jar")
+    os.chmod("/usr/local/bin/apktool", 0o755)
 
     print("Environment setup complete!")
     print("-" * 30)
     return keystore_filename
 
+def extract_native_libs(apk_path: str, output_folder: str):
+    """
+    Extracts only the lib/ tree of an APK, which is stored as plain files and needs no decoding.
+    """
+    print(f"Extracting native libraries from {apk_path}...")
+    with zipfile.ZipFile(apk_path) as z:
+        z.extractall(output_folder, members=[n for n in z.namelist() if n.startswith("lib/")])
+
 def download_and_decompile(base_apk_dlink: str, split_apk_dlink: str):
     """
-    Downloads and decompiles the base and split APKs.
-    Returns the names of the decompiled directories.
+    Downloads both APKs, decompiles the base and extracts the split's native libraries.
+    Returns the names of the output directories.
     """
     print("Downloading and decompiling APKs...")
 
-    run_command(["wget", "-q", base_apk_dlink, "-O", "base.apk"], "Failed to download base APK")
-    run_command(["wget", "-q", split_apk_dlink, "-O", "split.apk"], "Failed to download split APK")
-
-    run_command(["apktool", "d", "base.apk"], "Failed to decompile base APK")
-    run_command(["apktool", "d", "split.apk"], "Failed to decompile split APK")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        downloads = [
+            pool.submit(_download, base_apk_dlink, "base.apk", "Failed to download base APK"),
+            pool.submit(_download, split_apk_dlink, "split.apk", "Failed to download split APK"),
+        ]
+        for future in downloads:
+            future.result()
+
+        decompiles = [
+            pool.submit(run_command, ["apktool", "d", "-s", "-j", APKTOOL_JOBS, "base.apk"], "Failed to decompile base APK", verbose=True, env=_apktool_env()),
+            pool.submit(extract_native_libs, "split.apk", "split"),
+        ]
+        for future in decompiles:
+            future.result()
 
     base_decompile_folder = "base"
     split_decompile_folder = "split"
 
     print(f"Decompiled base to: {base_decompile_folder}")
-    print(f"Decompiled split to: {split_decompile_folder}")
+    print(f"Extracted split native libraries to: {split_decompile_folder}")
 
     print("Decompilation complete!")
     print("-" * 30)
 
     return base_decompile_folder, split_decompile_folder
 
+def _link_or_copy(src: str, dst: str):
+    """
+    Hardlinks src to dst so merging is a metadata-only operation, copying when linking is not possible.
+    """
+    try:
+        if os.path.lexists(dst):
+            os.unlink(dst)
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
 def merge_apks(base_folder: str, split_folder: str):
     print(f"Merging contents from {split_folder} into {base_folder}...")
 
-    dirs_to_merge = ['lib', 'res', 'assets']
-
-    for item in os.listdir(split_folder):
-        if item.startswith('smali'):
-            dirs_to_merge.append(item)
+    split_dir = f"{split_folder}/lib"
+    base_dir = f"{base_folder}/lib"
 
-    dirs_to_merge = list(set(dirs_to_merge))
-
-    for dir_name in dirs_to_merge:
-        split_dir = os.path.join(split_folder, dir_name)
-        base_dir = os.path.join(base_folder, dir_name)
-
-        if os.path.exists(split_dir):
-            print(f"  - Merging directory: {dir_name}")
-            shutil.copytree(split_dir, base_dir, dirs_exist_ok=True)
-        else:
-            print(f"  - Directory '{dir_name}' not found in split, skipping.")
+    if os.path.exists(split_dir):
+        print("  - Merging directory: lib")
+        shutil.copytree(split_dir, base_dir, dirs_exist_ok=True, copy_function=_link_or_copy)
+    else:
+        print("  - Directory 'lib' not found in split, skipping.")
 
     print("Merge complete!")
     print("-" * 30)
@@ -94,26 +312,28 @@ def merge_apks(base_folder: str, split_folder: str):
 def modify_files(libmain_url: str, base_decompile_folder: str):
     print("🛠️ Modifying files...")
 
-    mod_dir = os.path.join(base_decompile_folder, "lib/arm64-v8a")
-    orig_file = os.path.join(mod_dir, "libmain.so")
-    new_orig_file = os.path.join(mod_dir, "libmain_orig.so")
-    mod_file_path = os.path.join(mod_dir, "libmain.so")
+    mod_dir = f"{base_decompile_folder}/lib/arm64-v8a"
+    orig_file = f"{mod_dir}/libmain.so"
+    new_orig_file = f"{mod_dir}/libmain_orig.so"
+    mod_file_path = f"{mod_dir}/libmain.so"
 
-    if os.path.exists(orig_file):
-        os.rename(orig_file, new_orig_file)
+    try:
+        os.replace(orig_file, new_orig_file)
         print(f"Renamed {orig_file} to {new_orig_file}")
+    except FileNotFoundError:
+        pass
 
-    run_command(["wget", "-q", libmain_url, "-O", mod_file_path], "Failed to download modded libmain.so")
+    _download(libmain_url, mod_file_path, "Failed to download modded libmain.so")
     print("File modification complete!")
     print("-" * 30)
 
-def recompile_and_sign(base_folder: str, output_dir: str, keystore_path: str):
+def recompile_and_sign(base_folder: str, output_dir: str, keystore_path: str, final_apk_name: str):
 
     print("Recompiling and signing APK...")
 
-    base_out_path = os.path.join(output_dir, "umamusume_patched.apk")
+    base_out_path = f"{output_dir}/umamusume_patched.apk"
 
-    run_command(["apktool", "b", base_folder, "-o", base_out_path], "Failed to recompile base APK")
+    run_command(["apktool", "b", "-j", APKTOOL_JOBS, base_folder, "-o", base_out_path], "Failed to recompile base APK", verbose=True, env=_apktool_env())
 
     if not os.path.exists(keystore_path):
         raise FileNotFoundError(f"Keystore not found: {keystore_path}")
@@ -122,109 +342,123 @@ def recompile_and_sign(base_folder: str, output_dir: str, keystore_path: str):
     keystore_pass = "android"
     key_pass = "android"
 
+    aligned_path = f"{output_dir}/umamusume_patched-aligned.apk"
+    final_path = f"{output_dir}/{final_apk_name}"
+
+    run_command([_find_build_tool("zipalign"), "-p", "-f", "4", base_out_path, aligned_path], "Failed to zipalign base APK", verbose=True)
+
     run_command([
-        "java", "-jar", "uber-apk-signer.jar",
-        "--apks", base_out_path,
+        _find_build_tool("apksigner"), "sign",
         "--ks", keystore_path,
-        "--ksAlias", keystore_alias,
-        "--ksPass", keystore_pass,
-        "--ksKeyPass", key_pass
-    ], "Failed to sign base APK with custom debug.keystore")
+        "--ks-key-alias", keystore_alias,
+        "--ks-pass", f"pass:{keystore_pass}",
+        "--key-pass", f"pass:{key_pass}",
+        "--out", final_path,
+        aligned_path
+    ], "Failed to sign base APK with custom debug.keystore", verbose=True)
+
+    for leftover in glob.glob(f"{output_dir}/umamusume_patched*") + glob.glob(f"{final_path}.idsig"):
+        if leftover != final_path:
+            os.unlink(leftover)
 
+    print(f"Final APK created: {final_path}")
     print("Recompilation and signing complete!")
     print("-" * 30)
 
-def finalize_apk(directory: str, final_apk_name: str):
-    print("Finalizing APK...")
+def _xml_attr_re(prefix: bytes, attr: bytes) -> "re.Pattern[bytes]":
+    return re.compile(rb'(\s' + re.escape(prefix + b':' + attr) + rb'\s*=\s*)(["\'])(.*?)\2', re.DOTALL)
 
-    signed_apk = os.path.join(directory, "umamusume_patched-aligned-signed.apk")
+def _get_xml_attr(tag: bytes, prefix: bytes, attr: bytes) -> Optional[bytes]:
+    match = _xml_attr_re(prefix, attr).search(tag)
+    return match.group(3) if match else None
 
-    if not os.path.exists(signed_apk):
-        raise FileNotFoundError(f"Missing signed base APK: {signed_apk}. Check uber-apk-signer output name.")
-
-    final_path = os.path.join(directory, final_apk_name)
-    os.rename(signed_apk, final_path)
+def _set_xml_attr(tag: bytes, prefix: bytes, attr: bytes, value: bytes) -> bytes:
+    """
+    Sets an attribute on a single start tag, keeping its quoting and every other attribute as they are.
+    """
+    pattern = _xml_attr_re(prefix, attr)
+    if pattern.search(tag):
+        return pattern.sub(lambda m: m.group(1) + m.group(2) + value + m.group(2), tag, count=1)
 
-    print(f"Final APK created: {final_path}")
-    print("-" * 30)
+    end = len(tag) - 2 if tag.endswith(b"/>") else len(tag) - 1
+    return tag[:end].rstrip() + b" " + prefix + b":" + attr + b'="' + value + b'"' + tag[end:]
 
 def configure_file_provider(base_folder: str):
+    """
+    Edits the app's existing FileProvider in place at the byte level, so the manifest is not re-parsed.
+    Only the attributes the autoupdater depends on are set; everything else in the element is preserved.
+    """
     print("Configuring the application's FileProvider for autoupdater...")
-    manifest_path = os.path.join(base_folder, "AndroidManifest.xml")
+    manifest_path = f"{base_folder}/AndroidManifest.xml"
 
-    try:
-        ET.register_namespace('android', 'http://schemas.android.com/apk/res/android')
-    except AttributeError:
-        pass
+    with open(manifest_path, "rb") as f:
+        data = f.read()
 
-    tree = ET.parse(manifest_path)
-    root = tree.getroot()
+    prefix_match = _ANDROID_PREFIX_RE.search(data)
+    prefix = prefix_match.group(1) if prefix_match else b"android"
 
-    package_name = root.get('package')
-    if not package_name:
+    package_match = _MANIFEST_PACKAGE_RE.search(data)
+    if package_match is None:
         raise RuntimeError("Could not find 'package' attribute in <manifest> tag.")
-    target_authority = f"{package_name}.provider"
+    target_authority = package_match.group(2) + b".provider"
 
-    application_tag = root.find('application')
-    if application_tag is None:
+    if b"<application" not in data:
         raise RuntimeError("<application> tag not found in AndroidManifest.xml")
 
-    provider_name_to_find = 'androidx.core.content.FileProvider'
-    found_provider = None
-
-    for provider in application_tag.findall('provider'):
-        name = provider.get('{http://schemas.android.com/apk/res/android}name')
-        if name == provider_name_to_find:
-            found_provider = provider
+    provider_tag = None
+    for match in _PROVIDER_TAG_RE.finditer(data):
+        if _get_xml_attr(match.group(0), prefix, b"name") == _FILE_PROVIDER_NAME:
+            provider_tag = match
             break
 
-    if found_provider is None:
-        raise RuntimeError(f"Could not find an existing '{provider_name_to_find}' in the manifest.")
+    if provider_tag is None:
+        raise RuntimeError("Could not find an existing 'androidx.core.content.FileProvider' in the manifest.")
 
-    print(f"Found existing FileProvider. Overwriting its authority to '{target_authority}'")
-    found_provider.set('{http://schemas.android.com/apk/res/android}authorities', target_authority)
+    body_end = -1 if provider_tag.group(0).endswith(b"/>") else data.find(b"</provider>", provider_tag.end())
+    body = data[provider_tag.end():body_end] if body_end != -1 else b""
 
-    found_provider.set('{http://schemas.android.com/apk/res/android}exported', 'false')
-    found_provider.set('{http://schemas.android.com/apk/res/android}grantUriPermissions', 'true')
+    meta_data_tag = None
+    for match in _META_DATA_TAG_RE.finditer(body):
+        if _get_xml_attr(match.group(0), prefix, b"name") == _FILE_PROVIDER_PATHS_NAME:
+            meta_data_tag = match
+            break
 
-    meta_data_tag = found_provider.find('meta-data')
     if meta_data_tag is None:
         raise RuntimeError("The existing FileProvider is missing its required <meta-data> tag.")
 
-    xml_dir = os.path.join(base_folder, "res", "xml")
+    xml_dir = f"{base_folder}/res/xml"
     os.makedirs(xml_dir, exist_ok=True)
-    provider_paths_xml_path = os.path.join(xml_dir, "provider_paths.xml")
+    provider_paths_xml_path = f"{xml_dir}/provider_paths.xml"
 
-    content = """<?xml version="1.0" encoding="utf-8"?>
-<paths>
-    <cache-path name="cache" path="." />
-</paths>
-"""
-    with open(provider_paths_xml_path, "w") as f:
-        f.write(content)
+    fd = os.open(provider_paths_xml_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, _PROVIDER_PATHS_XML)
+    finally:
+        os.close(fd)
     print(f"Created/overwrote '{provider_paths_xml_path}' to ensure cache path is available.")
 
-    meta_data_tag.set('{http://schemas.android.com/apk/res/android}resource', '@xml/provider_paths')
+    print(f"Found existing FileProvider. Overwriting its authority to '{target_authority.decode()}'")
+    new_provider_tag = _set_xml_attr(provider_tag.group(0), prefix, b"authorities", target_authority)
+    new_provider_tag = _set_xml_attr(new_provider_tag, prefix, b"exported", b"false")
+    new_provider_tag = _set_xml_attr(new_provider_tag, prefix, b"grantUriPermissions", b"true")
+
+    new_meta_data_tag = _set_xml_attr(meta_data_tag.group(0), prefix, b"resource", b"@xml/provider_paths")
+    new_body = body[:meta_data_tag.start()] + new_meta_data_tag + body[meta_data_tag.end():]
+
+    with open(manifest_path, "wb") as f:
+        f.write(data[:provider_tag.start()] + new_provider_tag + new_body + data[provider_tag.end() + len(body):])
     print("Pointed FileProvider's meta-data to '@xml/provider_paths'.")
 
-    tree.write(manifest_path, encoding='utf-8', xml_declaration=True)
     print("FileProvider configuration complete!")
     print("-" * 30)
 
 def strip_split_metadata(base_folder: str):
     print("Stripping split-related metadata from AndroidManifest.xml...")
-    manifest_path = os.path.join(base_folder, "AndroidManifest.xml")
-
-    try:
-        ET.register_namespace('android', 'http://schemas.android.com/apk/res/android')
-    except AttributeError:
-        pass
+    manifest_path = f"{base_folder}/AndroidManifest.xml"
 
     tree = ET.parse(manifest_path)
     root = tree.getroot()
 
-    NS_ANDROID = '{http://schemas.android.com/apk/res/android}'
-
     permission_name = "android.permission.REQUEST_INSTALL_PACKAGES"
     permission_already_exists = False
     for perm in root.findall('uses-permission'):
@@ -238,11 +472,7 @@ def strip_split_metadata(base_folder: str):
         new_permission = ET.Element('uses-permission', {f'{NS_ANDROID}name': permission_name})
         root.insert(1, new_permission)
 
-    manifest_attrs_to_remove = [
-        'requiredSplitTypes',
-        'splitTypes'
-    ]
-    for attr in manifest_attrs_to_remove:
+    for attr in _SPLIT_MANIFEST_ATTRS:
         attr_key = f'{NS_ANDROID}{attr}'
         if attr_key in root.attrib:
             del root.attrib[attr_key]
@@ -252,15 +482,9 @@ def strip_split_metadata(base_folder: str):
     if application_tag is None:
         raise RuntimeError("<application> tag not found in AndroidManifest.xml")
 
-    meta_data_to_remove = [
-        'com.android.vending.splits',
-        'com.android.vending.splits.required',
-        'com.google.android.play.core.splitcompat.REQUIRED',
-    ]
-
     for meta_data in application_tag.findall('meta-data'):
         name = meta_data.get(f'{NS_ANDROID}name')
-        if name in meta_data_to_remove:
+        if name in _SPLIT_META_DATA:
             print(f"  - Removing meta-data: {name}")
             application_tag.remove(meta_data)
 
@@ -294,9 +518,7 @@ def main():
 
         modify_files(args.libmain_url, base_decompile_dir)
 
-        recompile_and_sign(base_decompile_dir, ".", keystore_path)
-
-        finalize_apk(".", final_apk_name)
+        recompile_and_sign(base_decompile_dir, ".", keystore_path, final_apk_name)
 
         print(f"Process complete! The patched APK '{final_apk_name}' is ready.")
     except Exception as e: